@@ -21,12 +21,14 @@ setup(
     },
     test_suite="tests",
     install_requires=[
-        "asgiref",
-        "prometheus_client>=0.0.11",
+        "prometheus_client>=0.5.0",
         "pyyaml",
         "requests",
         'Werkzeug',
     ],
+    extras_require={
+        'fast': ['orjson'],
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Information Technology",
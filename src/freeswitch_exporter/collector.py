@@ -4,18 +4,117 @@ Prometheus collecters for FreeSWITCH.
 # pylint: disable=too-few-public-methods
 
 import asyncio
+import concurrent.futures
+import functools
 import itertools
-import json
+import operator
+import threading
+import time
+import xml.etree.ElementTree as ET
 
-#from contextlib import asynccontextmanager
+try:
+    import orjson
+except ImportError:
+    import json as orjson
 
-from asgiref.sync import async_to_sync
-from prometheus_client import CollectorRegistry, generate_latest
 from prometheus_client.core import GaugeMetricFamily
 
-from freeswitch_exporter.esl import ESL
+from freeswitch_exporter.esl import ESL, ESLError, ESLPool
+from freeswitch_exporter.exposition import GaugeRows, render
 
-import xml.etree.ElementTree as ET
+
+class _SofiaTarget():
+    """
+    XML parser target collecting the text of selected child elements of each
+    record element, e.g. name and state of every profile in the sofia status
+    overview. No element tree is built.
+    """
+
+    def __init__(self, records, fields):
+        self._records = records
+        self._fields = fields
+        self._result = []
+        self._record = None
+        # Element depth relative to the current record element.
+        self._depth = 0
+        self._field = None
+        self._text = []
+
+    def start(self, tag, _attrib):  # pylint: disable=missing-docstring
+        if self._record is None:
+            if tag in self._records:
+                self._record = {}
+                self._depth = 0
+                self._result.append((tag, self._record))
+            return
+
+        self._depth += 1
+        if self._depth == 1 and tag in self._fields \
+                and tag not in self._record:
+            self._field = tag
+            self._text = []
+
+    def data(self, data):  # pylint: disable=missing-docstring
+        if self._field is not None:
+            self._text.append(data)
+
+    def end(self, tag):  # pylint: disable=missing-docstring
+        if self._record is None:
+            return
+
+        if self._depth == 0:
+            self._record = None
+        else:
+            if self._depth == 1 and self._field == tag:
+                self._record[tag] = ''.join(self._text)
+                self._field = None
+            self._depth -= 1
+
+    def close(self):  # pylint: disable=missing-docstring
+        return self._result
+
+
+def _parse_sofia(xml, records, fields):
+    """
+    Returns a list of (tag, {field: text}) tuples for every record element.
+    """
+    parser = ET.XMLParser(target=_SofiaTarget(records, fields))
+    parser.feed(xml)
+    return parser.close()
+
+
+_OVERVIEW_RECORDS = frozenset({'profile', 'gateway'})
+_OVERVIEW_FIELDS = frozenset({'name', 'state'})
+
+_PROFILE_RECORDS = frozenset({'profile-info'})
+_PROFILE_FIELDS = frozenset({
+    'calls-in',
+    'calls-out',
+    'failed-calls-in',
+    'failed-calls-out',
+    'registrations',
+})
+
+_GATEWAY_RECORDS = frozenset({'gateway'})
+_GATEWAY_FIELDS = frozenset({
+    'calls-in',
+    'calls-out',
+    'failed-calls-in',
+    'failed-calls-out',
+    'status',
+})
+
+# Seconds for which replies to slow commands are reused by subsequent scrapes.
+_CACHE_TTLS = {
+    'api sofia xmlstatus profile ': 5,
+    'api sofia xmlstatus gateway ': 5,
+}
+
+_MILLISECOND_METRICS = frozenset({
+    'variable_rtp_audio_in_jitter_min_variance',
+    'variable_rtp_audio_in_jitter_max_variance',
+    'variable_rtp_audio_in_mean_interval',
+})
 
 
 class ESLProcessInfo():
@@ -23,7 +122,7 @@ class ESLProcessInfo():
     Process info async collector
     """
 
-    def __init__(self, esl: ESL):
+    def __init__(self, esl: ESLPool):
         self._esl = esl
 
     async def collect(self):
@@ -33,7 +132,7 @@ class ESLProcessInfo():
 
         (_, result) = await self._esl.send(
             'api json {"command" : "status", "data" : ""}')
-        response = json.loads(result).get('response', {})
+        response = orjson.loads(result).get('response', {})
 
         test_metric = GaugeMetricFamily(
             'freeswitch_test',
@@ -76,18 +175,68 @@ class ESLProcessInfo():
 
                 process_session_metrics.append(process_session_metric)
 
-        return itertools.chain([
+        metrics = [
             process_info_metric,
             process_status_metric,
             process_memory_metric
-        ], process_session_metrics)
+        ]
+        metrics.extend(process_session_metrics)
+        return metrics
 
 class ESLSofiaInfo():
     """
     Sofia info async collector
     """
 
-    def __init__(self, esl: ESL):
+    _PROFILE_METRIC_SPECS = (
+        ('calls-in',
+         'freeswitch_sofia_profile_calls_in',
+         'Total number of calls coming in via the profile',
+         ('name',)),
+        ('calls-out',
+         'freeswitch_sofia_profile_calls_out',
+         'Total number of calls coming out via the profile',
+         ('name',)),
+        ('failed-calls-in',
+         'freeswitch_sofia_profile_failed_calls_in',
+         'Total number of failed calls coming in via the profile',
+         ('name',)),
+        ('failed-calls-out',
+         'freeswitch_sofia_profile_failed_calls_out',
+         'Total number of failed calls coming out via the profile',
+         ('name',)),
+        ('registrations',
+         'freeswitch_sofia_profile_registrations',
+         'Total number of registrations on profile',
+         ('name',)),
+    )
+
+    _GATEWAY_METRIC_SPECS = (
+        ('calls-in',
+         'freeswitch_sofia_gateway_calls_in',
+         'Total number of calls coming in via the gateway',
+         ('name',)),
+        ('calls-out',
+         'freeswitch_sofia_gateway_calls_out',
+         'Total number of calls coming out via the gateway',
+         ('name',)),
+        ('failed-calls-in',
+         'freeswitch_sofia_gateway_failed_calls_in',
+         'Total number of failed calls coming in via the gateway',
+         ('name',)),
+        ('failed-calls-out',
+         'freeswitch_sofia_gateway_failed_calls_out',
+         'Total number of failed calls coming out via the gateway',
+         ('name',)),
+    )
+
+    # Extract the texts of all metric fields of a record in spec order.
+    _PROFILE_VALUES = operator.itemgetter(
+        *(spec[0] for spec in _PROFILE_METRIC_SPECS))
+    _GATEWAY_VALUES = operator.itemgetter(
+        *(spec[0] for spec in _GATEWAY_METRIC_SPECS))
+
+    def __init__(self, esl: ESLPool):
         self._esl = esl
 
     async def collect(self):
@@ -99,12 +248,15 @@ class ESLSofiaInfo():
         Profile metrics
         """
         (_, result) = await self._esl.send("api sofia xmlstatus")
-        tree = ET.fromstring(result)
+        overview = _parse_sofia(
+            result, _OVERVIEW_RECORDS, _OVERVIEW_FIELDS)
 
         profiles_state = {}
-        for profile in tree.iter("profile"):
-            profile_name = profile.find("name").text
-            profile_state = profile.find("state").text
+        for tag, profile in overview:
+            if tag != 'profile':
+                continue
+            profile_name = profile['name']
+            profile_state = profile['state']
             if profile_name not in profiles_state:
                 profiles_state[profile_name] = 0
 
@@ -113,73 +265,58 @@ class ESLSofiaInfo():
             else:
                 profiles_state[profile_name] -= 1
 
+        gateway_names = [
+            gateway['name'] for tag, gateway in overview if tag == 'gateway']
+
+        profile_results, gateway_results = await asyncio.gather(
+            asyncio.gather(*[
+                self._esl.send(f'api sofia xmlstatus profile {profile_name}')
+                for profile_name in profiles_state]),
+            asyncio.gather(*[
+                self._esl.send(f'api sofia xmlstatus gateway {gateway_name}')
+                for gateway_name in gateway_names]))
+
         profile_metrics = {
-            'calls-in': GaugeMetricFamily(
-                'freeswitch_sofia_profile_calls_in',
-                'Total number of calls coming in via the profile',
-                labels=['name']),
-            'calls-out': GaugeMetricFamily(
-                'freeswitch_sofia_profile_calls_out',
-                'Total number of calls coming out via the profile',
-                labels=['name']),
-            'failed-calls-in': GaugeMetricFamily(
-                'freeswitch_sofia_profile_failed_calls_in',
-                'Total number of failed calls coming in via the profile',
-                labels=['name']),
-            'failed-calls-out': GaugeMetricFamily(
-                'freeswitch_sofia_profile_failed_calls_out',
-                'Total number of failed calls coming out via the profile',
-                labels=['name']),
-            'registrations': GaugeMetricFamily(
-                'freeswitch_sofia_profile_registrations',
-                'Total number of registrations on profile',
-                labels=['name']),
+            key: GaugeMetricFamily(name, documentation, labels=labels)
+            for key, name, documentation, labels in self._PROFILE_METRIC_SPECS
         }
 
         profile_up_metric = GaugeMetricFamily('freeswitch_sofia_profile_up', 'Shows, if gateway is up', labels=['name'])
-        for profile_name, state in profiles_state.items():
+        for (profile_name, state), (_, profile_result) in zip(
+                profiles_state.items(), profile_results):
             profile_up_metric.add_metric([profile_name], state)
-            (_, profile_result) = await self._esl.send(f'api sofia xmlstatus profile {profile_name}')
-            profile = ET.fromstring(profile_result).find('profile-info')
-            for key, profile_metric in profile_metrics.items():
-                value = int(profile.find(key).text)
-                profile_metric.add_metric([profile_name], value)
+            ((_, profile),) = _parse_sofia(
+                profile_result, _PROFILE_RECORDS, _PROFILE_FIELDS)
+            values = map(int, self._PROFILE_VALUES(profile))
+            label_values = [profile_name]
+            for profile_metric, value in zip(profile_metrics.values(), values):
+                profile_metric.add_metric(label_values, value)
 
         """
         Gateway metrics
         """
         gateway_metrics = {
-            'calls-in': GaugeMetricFamily(
-                'freeswitch_sofia_gateway_calls_in',
-                'Total number of calls coming in via the gateway',
-                labels=['name']),
-            'calls-out': GaugeMetricFamily(
-                'freeswitch_sofia_gateway_calls_out',
-                'Total number of calls coming out via the gateway',
-                labels=['name']),
-            'failed-calls-in': GaugeMetricFamily(
-                'freeswitch_sofia_gateway_failed_calls_in',
-                'Total number of failed calls coming in via the gateway',
-                labels=['name']),
-            'failed-calls-out': GaugeMetricFamily(
-                'freeswitch_sofia_gateway_failed_calls_out',
-                'Total number of failed calls coming out via the gateway',
-                labels=['name'])
+            key: GaugeMetricFamily(name, documentation, labels=labels)
+            for key, name, documentation, labels in self._GATEWAY_METRIC_SPECS
         }
 
         gateway_up_metric = GaugeMetricFamily('freeswitch_sofia_gateway_up', 'Shows, if gateway is up', labels=['name'])
-        for gateway in tree.iter("gateway"):
-            gateway_name = gateway.find("name").text
-            (_, gateway_result) = await self._esl.send(f'api sofia xmlstatus gateway {gateway_name}')
-            gateway_data = ET.fromstring(gateway_result)
+        for gateway_name, (_, gateway_result) in zip(
+                gateway_names, gateway_results):
+            ((_, gateway_data),) = _parse_sofia(
+                gateway_result, _GATEWAY_RECORDS, _GATEWAY_FIELDS)
 
-            gateway_up_metric.add_metric([gateway_name], int(gateway_data.find('status').text == "UP"))
+            gateway_up_metric.add_metric([gateway_name], int(gateway_data['status'] == "UP"))
 
-            for key, gateway_metric in gateway_metrics.items():
-                value = int(gateway_data.find(key).text)
-                gateway_metric.add_metric([gateway_name], value)
+            values = map(int, self._GATEWAY_VALUES(gateway_data))
+            label_values = [gateway_name]
+            for gateway_metric, value in zip(gateway_metrics.values(), values):
+                gateway_metric.add_metric(label_values, value)
 
-        return itertools.chain([gateway_up_metric, profile_up_metric], gateway_metrics.values(), profile_metrics.values())
+        metrics = [gateway_up_metric, profile_up_metric]
+        metrics.extend(gateway_metrics.values())
+        metrics.extend(profile_metrics.values())
+        return metrics
 
 
 class ESLChannelInfo():
@@ -187,166 +324,299 @@ class ESLChannelInfo():
     Channel info async collector
     """
 
-    def __init__(self, esl: ESL):
+    _CHANNEL_METRIC_SPECS = (
+        ('variable_rtp_audio_in_raw_bytes',
+         'rtp_audio_in_raw_bytes_total',
+         'Total number of bytes received via this channel.',
+         ('id',)),
+        ('variable_rtp_audio_out_raw_bytes',
+         'rtp_audio_out_raw_bytes_total',
+         'Total number of bytes sent via this channel.',
+         ('id',)),
+        ('variable_rtp_audio_in_media_bytes',
+         'rtp_audio_in_media_bytes_total',
+         'Total number of media bytes received via this channel.',
+         ('id',)),
+        ('variable_rtp_audio_out_media_bytes',
+         'rtp_audio_out_media_bytes_total',
+         'Total number of media bytes sent via this channel.',
+         ('id',)),
+        ('variable_rtp_audio_in_packet_count',
+         'rtp_audio_in_packets_total',
+         'Total number of packets received via this channel.',
+         ('id',)),
+        ('variable_rtp_audio_out_packet_count',
+         'rtp_audio_out_packets_total',
+         'Total number of packets sent via this channel.',
+         ('id',)),
+        ('variable_rtp_audio_in_media_packet_count',
+         'rtp_audio_in_media_packets_total',
+         'Total number of media packets received via this channel.',
+         ('id',)),
+        ('variable_rtp_audio_out_media_packet_count',
+         'rtp_audio_out_media_packets_total',
+         'Total number of media packets sent via this channel.',
+         ('id',)),
+        ('variable_rtp_audio_in_skip_packet_count',
+         'rtp_audio_in_skip_packets_total',
+         'Total number of inbound packets discarded by this channel.',
+         ('id',)),
+        ('variable_rtp_audio_out_skip_packet_count',
+         'rtp_audio_out_skip_packets_total',
+         'Total number of outbound packets discarded by this channel.',
+         ('id',)),
+        ('variable_rtp_audio_in_jitter_packet_count',
+         'rtp_audio_in_jitter_packets_total',
+         'Total number of ? packets in this channel.',
+         ('id',)),
+        ('variable_rtp_audio_in_dtmf_packet_count',
+         'rtp_audio_in_dtmf_packets_total',
+         'Total number of ? packets in this channel.',
+         ('id',)),
+        ('variable_rtp_audio_out_dtmf_packet_count',
+         'rtp_audio_out_dtmf_packets_total',
+         'Total number of ? packets in this channel.',
+         ('id',)),
+        ('variable_rtp_audio_in_cng_packet_count',
+         'rtp_audio_in_cng_packets_total',
+         'Total number of ? packets in this channel.',
+         ('id',)),
+        ('variable_rtp_audio_out_cng_packet_count',
+         'rtp_audio_out_cng_packets_total',
+         'Total number of ? packets in this channel.',
+         ('id',)),
+        ('variable_rtp_audio_in_flush_packet_count',
+         'rtp_audio_in_flush_packets_total',
+         'Total number of ? packets in this channel.',
+         ('id',)),
+        ('variable_rtp_audio_in_largest_jb_size',
+         'rtp_audio_in_jitter_buffer_bytes_max',
+         'Largest jitterbuffer size in this channel.',
+         ('id',)),
+        ('variable_rtp_audio_in_jitter_min_variance',
+         'rtp_audio_in_jitter_seconds_min',
+         'Minimal jitter in seconds.',
+         ('id',)),
+        ('variable_rtp_audio_in_jitter_max_variance',
+         'rtp_audio_in_jitter_seconds_max',
+         'Maximum jitter in seconds.',
+         ('id',)),
+        ('variable_rtp_audio_in_jitter_loss_rate',
+         'rtp_audio_in_jitter_loss_rate',
+         'Ratio of lost packets due to inbound jitter.',
+         ('id',)),
+        ('variable_rtp_audio_in_jitter_burst_rate',
+         'rtp_audio_in_jitter_burst_rate',
+         'Ratio of packet bursts due to inbound jitter.',
+         ('id',)),
+        ('variable_rtp_audio_in_mean_interval',
+         'rtp_audio_in_mean_interval_seconds',
+         'Mean interval in seconds of inbound packets',
+         ('id',)),
+        ('variable_rtp_audio_in_flaw_total',
+         'rtp_audio_in_flaw_total',
+         'Total number of flaws detected in the channel',
+         ('id',)),
+        ('variable_rtp_audio_in_quality_percentage',
+         'rtp_audio_in_quality_percent',
+         'Audio quality in percent',
+         ('id',)),
+        ('variable_rtp_audio_in_mos',
+         'rtp_audio_in_quality_mos',
+         'Audio quality as Mean Opinion Score, (between 1 and 5)',
+         ('id',)),
+        ('variable_rtp_audio_rtcp_octet_count',
+         'rtcp_audio_bytes_total',
+         'Total number of rtcp bytes in this channel.',
+         ('id',)),
+        ('variable_rtp_audio_rtcp_packet_count',
+         'rtcp_audio_packets_total',
+         'Total number of rtcp packets in this channel.',
+         ('id',)),
+    )
+
+    def __init__(self, esl: ESLPool, max_inflight: int = 32):
         self._esl = esl
+        self._max_inflight = max_inflight
+
+    async def _fetch_channelvars(self, rows):
+        """
+        Returns a list of (row, channel variables) tuples for the given calls.
+        """
+        if not rows:
+            return []
+
+        # Spread the channels over the pooled connections, one batch each, but
+        # never have more than max_inflight of them pending at FreeSWITCH.
+        connections = self._esl.size
+        size = min(-(-len(rows) // connections),
+                   max(1, self._max_inflight // connections))
+        inflight = asyncio.Semaphore(max(1, self._max_inflight // size))
+
+        async def _fetch(batch):
+            commands = []
+            for row in batch:
+                uuid = row['uuid']
+                commands.append(f'api uuid_set_media_stats {uuid}')
+                commands.append(f'api uuid_dump {uuid} json')
+            async with inflight:
+                replies = await self._esl.send_many(commands)
+            return [(row, orjson.loads(result))
+                    for row, (_, result) in zip(batch, replies[1::2])]
+
+        batches = await asyncio.gather(*[
+            _fetch(rows[start:start + size])
+            for start in range(0, len(rows), size)])
+
+        return list(itertools.chain.from_iterable(batches))
 
     async def collect(self):
         """
         Collects channel metrics.
         """
 
-        channel_metrics = {
-            'variable_rtp_audio_in_raw_bytes': GaugeMetricFamily(
-                'rtp_audio_in_raw_bytes_total',
-                'Total number of bytes received via this channel.',
-                labels=['id']),
-            'variable_rtp_audio_out_raw_bytes': GaugeMetricFamily(
-                'rtp_audio_out_raw_bytes_total',
-                'Total number of bytes sent via this channel.',
-                labels=['id']),
-            'variable_rtp_audio_in_media_bytes': GaugeMetricFamily(
-                'rtp_audio_in_media_bytes_total',
-                'Total number of media bytes received via this channel.',
-                labels=['id']),
-            'variable_rtp_audio_out_media_bytes': GaugeMetricFamily(
-                'rtp_audio_out_media_bytes_total',
-                'Total number of media bytes sent via this channel.',
-                labels=['id']),
-            'variable_rtp_audio_in_packet_count': GaugeMetricFamily(
-                'rtp_audio_in_packets_total',
-                'Total number of packets received via this channel.',
-                labels=['id']),
-            'variable_rtp_audio_out_packet_count': GaugeMetricFamily(
-                'rtp_audio_out_packets_total',
-                'Total number of packets sent via this channel.',
-                labels=['id']),
-            'variable_rtp_audio_in_media_packet_count': GaugeMetricFamily(
-                'rtp_audio_in_media_packets_total',
-                'Total number of media packets received via this channel.',
-                labels=['id']),
-            'variable_rtp_audio_out_media_packet_count': GaugeMetricFamily(
-                'rtp_audio_out_media_packets_total',
-                'Total number of media packets sent via this channel.',
-                labels=['id']),
-            'variable_rtp_audio_in_skip_packet_count': GaugeMetricFamily(
-                'rtp_audio_in_skip_packets_total',
-                'Total number of inbound packets discarded by this channel.',
-                labels=['id']),
-            'variable_rtp_audio_out_skip_packet_count': GaugeMetricFamily(
-                'rtp_audio_out_skip_packets_total',
-                'Total number of outbound packets discarded by this channel.',
-                labels=['id']),
-            'variable_rtp_audio_in_jitter_packet_count': GaugeMetricFamily(
-                'rtp_audio_in_jitter_packets_total',
-                'Total number of ? packets in this channel.',
-                labels=['id']),
-            'variable_rtp_audio_in_dtmf_packet_count': GaugeMetricFamily(
-                'rtp_audio_in_dtmf_packets_total',
-                'Total number of ? packets in this channel.',
-                labels=['id']),
-            'variable_rtp_audio_out_dtmf_packet_count': GaugeMetricFamily(
-                'rtp_audio_out_dtmf_packets_total',
-                'Total number of ? packets in this channel.',
-                labels=['id']),
-            'variable_rtp_audio_in_cng_packet_count': GaugeMetricFamily(
-                'rtp_audio_in_cng_packets_total',
-                'Total number of ? packets in this channel.',
-                labels=['id']),
-            'variable_rtp_audio_out_cng_packet_count': GaugeMetricFamily(
-                'rtp_audio_out_cng_packets_total',
-                'Total number of ? packets in this channel.',
-                labels=['id']),
-            'variable_rtp_audio_in_flush_packet_count': GaugeMetricFamily(
-                'rtp_audio_in_flush_packets_total',
-                'Total number of ? packets in this channel.',
-                labels=['id']),
-            'variable_rtp_audio_in_largest_jb_size': GaugeMetricFamily(
-                'rtp_audio_in_jitter_buffer_bytes_max',
-                'Largest jitterbuffer size in this channel.',
-                labels=['id']),
-            'variable_rtp_audio_in_jitter_min_variance': GaugeMetricFamily(
-                'rtp_audio_in_jitter_seconds_min',
-                'Minimal jitter in seconds.',
-                labels=['id']),
-            'variable_rtp_audio_in_jitter_max_variance': GaugeMetricFamily(
-                'rtp_audio_in_jitter_seconds_max',
-                'Maximum jitter in seconds.',
-                labels=['id']),
-            'variable_rtp_audio_in_jitter_loss_rate': GaugeMetricFamily(
-                'rtp_audio_in_jitter_loss_rate',
-                'Ratio of lost packets due to inbound jitter.',
-                labels=['id']),
-            'variable_rtp_audio_in_jitter_burst_rate': GaugeMetricFamily(
-                'rtp_audio_in_jitter_burst_rate',
-                'Ratio of packet bursts due to inbound jitter.',
-                labels=['id']),
-            'variable_rtp_audio_in_mean_interval': GaugeMetricFamily(
-                'rtp_audio_in_mean_interval_seconds',
-                'Mean interval in seconds of inbound packets',
-                labels=['id']),
-            'variable_rtp_audio_in_flaw_total': GaugeMetricFamily(
-                'rtp_audio_in_flaw_total',
-                'Total number of flaws detected in the channel',
-                labels=['id']),
-            'variable_rtp_audio_in_quality_percentage': GaugeMetricFamily(
-                'rtp_audio_in_quality_percent',
-                'Audio quality in percent',
-                labels=['id']),
-            'variable_rtp_audio_in_mos': GaugeMetricFamily(
-                'rtp_audio_in_quality_mos',
-                'Audio quality as Mean Opinion Score, (between 1 and 5)',
-                labels=['id']),
-            'variable_rtp_audio_rtcp_octet_count': GaugeMetricFamily(
-                'rtcp_audio_bytes_total',
-                'Total number of rtcp bytes in this channel.',
-                labels=['id']),
-            'variable_rtp_audio_rtcp_packet_count': GaugeMetricFamily(
-                'rtcp_audio_packets_total',
-                'Total number of rtcp packets in this channel.',
-                labels=['id']),
-        }
-
-        channel_info_metric = GaugeMetricFamily(
-            'rtp_channel_info',
-            'FreeSWITCH RTP channel info',
-            labels=['id', 'name', 'user_agent'])
-
         active_calls_metric = GaugeMetricFamily(
             'freeswitch_active_calls_count',
             'FreeSWITCH total active calls count')
 
-        millisecond_metrics = [
-            'variable_rtp_audio_in_jitter_min_variance',
-            'variable_rtp_audio_in_jitter_max_variance',
-            'variable_rtp_audio_in_mean_interval',
-        ]
-
         (_, result) = await self._esl.send('api show calls as json')
-        calls = json.loads(result)
+        calls = orjson.loads(result)
         active_calls_metric.add_metric([], calls['row_count'])
-        for row in calls.get('rows', []):
-            uuid = row['uuid']
 
-            await self._esl.send(f'api uuid_set_media_stats {uuid}')
-            (_, result) = await self._esl.send(f'api uuid_dump {uuid} json')
-            channelvars = json.loads(result)
+        rows = calls.get('rows', [])
+        if not rows:
+            return [active_calls_metric]
 
-            label_values = [uuid]
-            for key, metric_value in channelvars.items():
-                if key in millisecond_metrics:
+        channel_metrics = {
+            key: GaugeRows(name, documentation, labels=labels)
+            for key, name, documentation, labels in self._CHANNEL_METRIC_SPECS
+        }
+
+        channel_info_metric = GaugeRows(
+            'rtp_channel_info',
+            'FreeSWITCH RTP channel info',
+            labels=['id', 'name', 'user_agent'])
+
+        for row, channelvars in await self._fetch_channelvars(rows):
+            label_values = [row['uuid']]
+            for key, channel_metric in channel_metrics.items():
+                metric_value = channelvars.get(key)
+                if metric_value is None:
+                    continue
+                if key in _MILLISECOND_METRICS:
                     metric_value = float(metric_value) / 1000.
-                if key in channel_metrics:
-                    channel_metrics[key].add_metric(
-                        label_values, metric_value)
+                channel_metric.add_metric(label_values, metric_value)
 
             user_agent = channelvars.get('variable_sip_user_agent', 'Unknown')
-            channel_info_label_values = [uuid, row['name'], user_agent]
             channel_info_metric.add_metric(
-                channel_info_label_values, 1)
+                [row['uuid'], row['name'], user_agent], 1)
+
+        # Channel families without any channel would only add HELP and TYPE.
+        metrics = [channel_metric for channel_metric in channel_metrics.values()
+                   if channel_metric.values]
+        if channel_info_metric.values:
+            metrics.append(channel_info_metric)
+        metrics.append(active_calls_metric)
+        return metrics
 
-        return itertools.chain(
-            channel_metrics.values(),
-            [channel_info_metric, active_calls_metric])
+
+async def _connect(host, port, password) -> ESL:
+    reader, writer = await asyncio.open_connection(host, port)
+    esl = ESL(reader, writer)
+    try:
+        await esl.initialize()
+        if not await esl.login(password):
+            raise ESLError(f"Login to {host}:{port} failed")
+    except BaseException:
+        esl.close()
+        raise
+    return esl
+
+
+class ESLConnectionPool():
+    """
+    Keeps ESL connections open across scrapes, one ESLPool per FreeSWITCH
+    instance. The connections are bound to the event loop the pool is first
+    used in. Call close() from within that loop when done with the pool.
+
+    Pools of instances which were not scraped for max_idle seconds are closed,
+    as are the least recently used ones beyond max_pools.
+    """
+
+    max_pools = 64
+
+    def __init__(self, size=8, keepalive=30, ttls=None, timeout=10,
+                 max_idle=300):
+        self._size = size
+        self._keepalive = keepalive
+        self._ttls = _CACHE_TTLS if ttls is None else ttls
+        self._timeout = timeout
+        self._max_idle = max_idle
+        # (host, port, password) -> (pool, last use), least recent first.
+        self._pools = {}
+        self._loop = None
+
+    def get(self, host, port, password) -> ESLPool:
+        """
+        Returns the connection pool for the given FreeSWITCH instance.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        elif self._loop is not loop:
+            raise RuntimeError("ESLConnectionPool used from another event loop")
+
+        key = (host, port, password)
+        pool, _ = self._pools.pop(key, (None, None))
+        if pool is None:
+            pool = ESLPool(
+                functools.partial(_connect, host, port, password), self._size,
+                self._ttls, self._timeout)
+            pool.start_keepalive(self._keepalive)
+
+        now = time.monotonic()
+        self._pools[key] = (pool, now)
+        self._evict(now)
+        return pool
+
+    def _evict(self, now):
+        while self._pools:
+            key, (pool, used) = next(iter(self._pools.items()))
+            if len(self._pools) <= self.max_pools \
+                    and now - used < self._max_idle:
+                break
+            del self._pools[key]
+            pool.close()
+
+    def close(self):
+        """
+        Close all pooled connections.
+        """
+        for pool, _ in self._pools.values():
+            pool.close()
+        self._pools.clear()
+
+
+_POOLS = ESLConnectionPool()
+
+_LOOP = None
+_LOOP_LOCK = threading.Lock()
+
+
+def _event_loop():
+    """
+    Returns the event loop shared by all scrapes. Pooled connections are bound
+    to it, hence it runs in a daemon thread for the lifetime of the process.
+    """
+    global _LOOP  # pylint: disable=global-statement
+
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(
+                target=_LOOP.run_forever, name='esl', daemon=True).start()
+
+    return _LOOP
 
 
 class ChannelCollector():
@@ -358,56 +628,68 @@ class ChannelCollector():
     freeswitch_version_info{release="15",repoid="7599e35a",version="4.4"} 1.0
     """
 
-    def __init__(self, host, port, password):
-        self._host = host
-        self._port = port
-        self._password = password
+    # Seconds after which collect() gives up on a scrape.
+    timeout = 30
 
-    # @asynccontextmanager
-    # async def _connect(self):
-    #     reader, writer = await asyncio.open_connection(self._host, self._port)
-    #     try:
-    #         esl = ESL(reader, writer)
-    #         await esl.initialize()
-    #         await esl.login(self._password)
-    #         yield esl
-    #     finally:
-    #         writer.close()
-    #         await writer.wait_closed()
-
-    @async_to_sync
-    async def collect(self):  # pylint: disable=missing-docstring
-        async with EslAsyncContextManager(self._host, self._port, self._password) as esl:
-            return itertools.chain(
-                await ESLProcessInfo(esl).collect(),
-                await ESLChannelInfo(esl).collect(),
-                await ESLSofiaInfo(esl).collect())
-
-class EslAsyncContextManager(object):
-    def __init__(self, host, port, password):
+    def __init__(self, host, port, password, max_inflight=32, pools=None):
         self._host = host
         self._port = port
         self._password = password
-        self._reader = {}
-        self._writer = {}
+        self._max_inflight = max_inflight
+        self._pools = _POOLS if pools is None else pools
+
+    def collect(self):  # pylint: disable=missing-docstring
+        future = asyncio.run_coroutine_threadsafe(
+            self.collect_async(), _event_loop())
+        try:
+            return future.result(self.timeout)
+        except concurrent.futures.TimeoutError:
+            # Release the pooled connections held by the abandoned scrape.
+            future.cancel()
+            raise
+
+    async def collect_async(self):
+        """
+        Collects all metrics without leaving the current event loop. Unless
+        the collector was given its own pools, this must run in the shared
+        event loop.
+        """
+        esl = self._pools.get(self._host, self._port, self._password)
+        metrics = []
+        for collected in await asyncio.gather(
+                ESLProcessInfo(esl).collect(),
+                ESLChannelInfo(esl, self._max_inflight).collect(),
+                ESLSofiaInfo(esl).collect()):
+            metrics += collected
+        return metrics
 
-    async def __aenter__(self):
-        self._reader, self._writer = await asyncio.open_connection(self._host, self._port)
-        esl = ESL(self._reader, self._writer)
-        await esl.initialize()
-        await esl.login(self._password)
-        return esl
 
-    async def __aexit__(self, exc_type, exc_value, traceback):
-        self._writer.close()
-        #await self._writer.wait_closed()
+def _render(metrics):
+    out = bytearray()
+    render(metrics, out)
+    return bytes(out)
+
 
 def collect_esl(config, host):
-    """Scrape a host and return prometheus text format for it (asinc)"""
+    """Scrape a host and return prometheus text format for it"""
+
+    port = config.get('port', 8021)
+    password = config.get('password', 'ClueCon')
+    max_inflight = config.get('max_inflight', 32)
+
+    collector = ChannelCollector(host, port, password, max_inflight)
+    return _render(collector.collect())
+
+
+async def collect_esl_async(config, host, pools: ESLConnectionPool):
+    """
+    Scrape a host and return prometheus text format for it (async). The
+    connections are taken from pools, which the caller owns and closes.
+    """
 
     port = config.get('port', 8021)
     password = config.get('password', 'ClueCon')
+    max_inflight = config.get('max_inflight', 32)
 
-    registry = CollectorRegistry()
-    registry.register(ChannelCollector(host, port, password))
-    return generate_latest(registry)
+    collector = ChannelCollector(host, port, password, max_inflight, pools)
+    return _render(await collector.collect_async())
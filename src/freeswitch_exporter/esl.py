@@ -4,7 +4,9 @@ Simple FreeSWITCH inbound event socket implementation based on asyncio
 
 import asyncio
 import logging
-from typing import Dict, Tuple
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
 
 
 class ESLError(Exception):
@@ -67,7 +69,8 @@ class ESL():
             self._log.debug("Received command/reply")
             result = True
         elif headers["Content-Type"] == "text/rude-rejection":
-            self._log.error("Received text/rude-rejection: %s", body)
+            self._log.error("Received text/rude-rejection: %s",
+                            body.decode(errors='replace'))
         else:
             raise ESLProtocolError(f"Expected auth response, "
                                    f"but got {headers!r}")
@@ -75,16 +78,28 @@ class ESL():
         self._log.info("Login: %s", "success" if result else "failure")
         return result
 
-    async def send(self, command: str) -> Tuple[Dict[str, str], str]:
+    async def send(self, command: str) -> Tuple[Dict[str, str], bytes]:
         """
-        Send command to FreeSWITCH. Returns a tuple (headers, body).
+        Send command to FreeSWITCH. Returns a tuple (headers, body), the body
+        is left undecoded.
         """
-        body = ""
-        headers = {}
-
         self._log.debug("Send %s", command)
         await self._write(command)
 
+        return await self._read_response()
+
+    async def send_many(self, commands: List[str]) \
+            -> List[Tuple[Dict[str, str], bytes]]:
+        """
+        Send multiple commands to FreeSWITCH in a single write. Returns a list
+        of (headers, body) tuples in the order of the commands.
+        """
+        self._log.debug("Send %s", commands)
+        await self._write_many(commands)
+
+        return [await self._read_response() for _ in commands]
+
+    async def _read_response(self) -> Tuple[Dict[str, str], bytes]:
         self._log.debug("Expect api/response")
         headers = await self._read_all_headers()
         body = await self._read_body(headers)
@@ -95,10 +110,20 @@ class ESL():
 
         return headers, body
 
+    def close(self):
+        """
+        Close the underlying connection.
+        """
+        self._out.close()
+
     async def _write(self, command: str):
         self._out.write(f'{command}\n\n'.encode())
         await self._out.drain()
 
+    async def _write_many(self, commands: List[str]):
+        self._out.write(('\n\n'.join(commands) + '\n\n').encode())
+        await self._out.drain()
+
     async def _read_headers(self):
         while True:
             line = await self._in.readline()
@@ -114,11 +139,175 @@ class ESL():
     async def _read_all_headers(self) -> Dict[str, str]:
         return {key: value async for key, value in self._read_headers()}
 
-    async def _read_body(self, headers: Dict[str, str]) -> str:
-        result = ""
+    async def _read_body(self, headers: Dict[str, str]) -> bytes:
+        result = b""
 
         if "Content-Length" in headers:
             size = int(headers["Content-Length"])
-            result = (await self._in.readexactly(size)).decode()
+            result = await self._in.readexactly(size)
+
+        return result
+
+
+class ESLPool():  # pylint: disable=too-many-instance-attributes
+    """
+    Pool of ESL connections to the same FreeSWITCH instance.
+
+    Exposes the same send() method as ESL, but dispatches each command to an
+    idle connection, so concurrent commands run in parallel. Connections are
+    opened lazily up to the given size, used in round-robin order and kept
+    open until they fail or the pool is closed.
+
+    Replies to commands starting with one of the prefixes in ttls are cached
+    for the given number of seconds. The cache is dropped whenever a
+    connection fails.
+
+    Connecting and each command must complete within timeout seconds,
+    otherwise the connection is dropped and asyncio.TimeoutError raised.
+    """
+
+    def __init__(self, connect: Callable[[], Awaitable[ESL]], size: int = 8,
+                 ttls: Optional[Dict[str, float]] = None,
+                 timeout: float = 10):
+        self._connect = connect
+        self._size = size
+        self._timeout = timeout
+        self._slots = asyncio.Semaphore(size)
+        self._idle: Deque[ESL] = deque()
+        self._ttls = ttls or {}
+        self._cache: Dict[str, Tuple[float, asyncio.Future]] = {}
+        self._keepalive: Optional[asyncio.Future] = None
+        self._closed = False
+        self._log = logging.getLogger('esl')
+
+    @property
+    def size(self) -> int:
+        """
+        Maximum number of connections.
+        """
+        return self._size
 
+    async def send(self, command: str) -> Tuple[Dict[str, str], bytes]:
+        """
+        Send command to FreeSWITCH using an idle connection, unless a cached
+        reply is available. Returns a tuple (headers, body).
+        """
+        ttl = next((ttl for prefix, ttl in self._ttls.items()
+                    if command.startswith(prefix)), 0)
+        if not ttl:
+            return await self._send(command)
+
+        now = time.monotonic()
+        entry = self._cache.get(command)
+        if entry is None or entry[0] <= now:
+            self._cache = {key: value for key, value in self._cache.items()
+                           if value[0] > now}
+            entry = (now + ttl, asyncio.ensure_future(self._send(command)))
+            self._cache[command] = entry
+
+        try:
+            # Concurrent callers share the reply, do not cancel it for all.
+            return await asyncio.shield(entry[1])
+        except Exception:
+            if self._cache.get(command) is entry:
+                del self._cache[command]
+            raise
+
+    async def _send(self, command: str) -> Tuple[Dict[str, str], bytes]:
+        return await self._run(lambda esl: esl.send(command))
+
+    async def send_many(self, commands: List[str]) \
+            -> List[Tuple[Dict[str, str], bytes]]:
+        """
+        Send multiple commands to FreeSWITCH in a single write over one idle
+        connection. Returns a list of (headers, body) tuples.
+        """
+        return await self._run(lambda esl: esl.send_many(commands))
+
+    async def _run(self, call):
+        esl, reused = await self._acquire()
+        try:
+            result = await asyncio.wait_for(call(esl), self._timeout)
+        except asyncio.TimeoutError:
+            # A stalled connection cannot be reused, its reply may arrive late.
+            self._discard(esl)
+            raise
+        except (ESLHeaderError, OSError, EOFError) as err:
+            self._discard(esl)
+            if not reused:
+                raise
+            # An idle connection may have gone stale, e.g. after a FreeSWITCH
+            # restart. All commands sent here are safe to repeat.
+            self._log.info("Idle connection failed, retry: %s", err)
+            esl, _ = await self._acquire()
+            try:
+                result = await asyncio.wait_for(call(esl), self._timeout)
+            except BaseException:
+                self._discard(esl)
+                raise
+        except BaseException:
+            self._discard(esl)
+            raise
+        self._release(esl)
         return result
+
+    def start_keepalive(self, interval: float):
+        """
+        Periodically send a status command over each idle connection, such
+        that broken connections are dropped before the next scrape needs them.
+        Runs until the pool is closed.
+        """
+        if self._keepalive is None:
+            self._keepalive = asyncio.ensure_future(self._keepalive_loop(interval))
+
+    async def _keepalive_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            for _ in range(len(self._idle)):
+                try:
+                    await self.send('api status')
+                except Exception:  # pylint: disable=broad-except
+                    self._log.warning("Keepalive failed", exc_info=True)
+
+    def close(self):
+        """
+        Stop the keepalive and close all idle connections. Connections still
+        in use are closed once their command completes.
+        """
+        self._closed = True
+        if self._keepalive is not None:
+            self._keepalive.cancel()
+            self._keepalive = None
+        self._close_idle()
+
+    def _close_idle(self):
+        while self._idle:
+            self._idle.popleft().close()
+
+    async def _acquire(self) -> Tuple[ESL, bool]:
+        """
+        Returns an idle or a new connection, and whether it was idle.
+        """
+        await self._slots.acquire()
+        if self._idle:
+            return self._idle.popleft(), True
+
+        try:
+            return await asyncio.wait_for(self._connect(), self._timeout), False
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, esl: ESL):
+        if self._closed:
+            esl.close()
+        else:
+            self._idle.append(esl)
+        self._slots.release()
+
+    def _discard(self, esl: ESL):
+        # Connections which failed alongside this one are likely stale too.
+        esl.close()
+        self._close_idle()
+        self._cache.clear()
+        self._slots.release()
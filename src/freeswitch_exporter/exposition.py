@@ -0,0 +1,84 @@
+"""
+Prometheus text format rendering for FreeSWITCH collectors.
+"""
+
+from array import array
+
+from prometheus_client.samples import Sample
+from prometheus_client.utils import floatToGoString
+
+
+class GaugeRows():
+    """
+    Gauge metric family which keeps its samples as plain label value rows and
+    a float array. render() writes them without building Sample objects, the
+    samples property provides them to prometheus_client when needed.
+    """
+
+    type = 'gauge'
+    unit = ''
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.label_values = []
+        self.values = array('d')
+
+    def add_metric(self, labels, value):
+        """
+        Add a sample with the given label values.
+        """
+        self.label_values.append(labels)
+        self.values.append(float(value))
+
+    @property
+    def samples(self):  # pylint: disable=missing-docstring
+        return [Sample(self.name, dict(zip(self.labels, label_values)), value)
+                for label_values, value in zip(self.label_values, self.values)]
+
+
+def _escape_help(text):
+    return text.replace('\\', r'\\').replace('\n', r'\n')
+
+
+def _escape_label(text):
+    return text.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _sample_line(name, labels, value):
+    if labels:
+        labelstr = ','.join(f'{label}="{_escape_label(label_value)}"'
+                            for label, label_value in labels)
+        return f'{name}{{{labelstr}}} {floatToGoString(value)}\n'
+    return f'{name} {floatToGoString(value)}\n'
+
+
+def render(metrics, out: bytearray):
+    """
+    Append metric families in the Prometheus text format to out.
+
+    The collectors only produce gauges, hence no counter or histogram specific
+    name munging is done.
+    """
+    for metric in metrics:
+        lines = [
+            f'# HELP {metric.name} {_escape_help(metric.documentation)}\n',
+            f'# TYPE {metric.name} '
+            f'{"untyped" if metric.type == "unknown" else metric.type}\n',
+        ]
+
+        if isinstance(metric, GaugeRows):
+            names = metric.labels
+            order = sorted(range(len(names)), key=names.__getitem__)
+            for label_values, value in zip(metric.label_values, metric.values):
+                lines.append(_sample_line(
+                    metric.name,
+                    [(names[i], label_values[i]) for i in order],
+                    value))
+        else:
+            for sample in metric.samples:
+                lines.append(_sample_line(
+                    sample.name, sorted(sample.labels.items()), sample.value))
+
+        out += ''.join(lines).encode()
@@ -0,0 +1,180 @@
+"""
+Tests for the FreeSWITCH collectors.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import threading
+import types
+import unittest
+from unittest import mock
+
+from freeswitch_exporter import collector
+from freeswitch_exporter.collector import (
+    ChannelCollector, ESLChannelInfo, ESLConnectionPool)
+
+
+class _StalledPool():
+    """
+    ESLPool stand-in which never replies.
+    """
+
+    size = 8
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    async def send(self, _command):  # pylint: disable=missing-docstring
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+    async def send_many(self, commands):  # pylint: disable=missing-docstring
+        return [await self.send(command) for command in commands]
+
+
+class _RecordingPool():
+    """
+    ESLPool stand-in which records how many channels are queried at once.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.pending = 0
+        self.max_pending = 0
+
+    async def send_many(self, commands):  # pylint: disable=missing-docstring
+        channels = len(commands) // 2
+        self.pending += channels
+        self.max_pending = max(self.max_pending, self.pending)
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.pending -= channels
+
+        replies = []
+        for command in commands:
+            if command.startswith('api uuid_dump '):
+                body = json.dumps({'uuid': command.split()[2]}).encode()
+            else:
+                body = b'+OK\n'
+            replies.append(({}, body))
+        return replies
+
+
+class _Pools():  # pylint: disable=too-few-public-methods
+    def __init__(self, pool):
+        self._pool = pool
+
+    def get(self, _host, _port, _password):  # pylint: disable=missing-docstring
+        return self._pool
+
+
+class CollectTimeoutTest(unittest.TestCase):
+    """
+    A scrape of a stalled FreeSWITCH gives up and releases its connections.
+    """
+
+    def test_collect_timeout(self):
+        pool = _StalledPool()
+        collector = ChannelCollector('127.0.0.1', 8021, 'ClueCon',
+                                     pools=_Pools(pool))
+        collector.timeout = 0.05
+        with self.assertRaises(concurrent.futures.TimeoutError):
+            collector.collect()
+        self.assertTrue(pool.cancelled.wait(1))
+
+
+
+class FetchChannelvarsTest(unittest.TestCase):
+    """
+    Channel variables are fetched in batches spread over the connections.
+    """
+
+    def _fetch(self, size, max_inflight, count):
+        pool = _RecordingPool(size)
+        rows = [{'uuid': f'uuid-{i}'} for i in range(count)]
+        channels = ESLChannelInfo(pool, max_inflight)
+        result = asyncio.run(
+            channels._fetch_channelvars(rows))  # pylint: disable=protected-access
+
+        self.assertEqual([row for row, _ in result], rows)
+        self.assertEqual([channelvars['uuid'] for _, channelvars in result],
+                         [row['uuid'] for row in rows])
+        self.assertLessEqual(pool.max_pending, max_inflight)
+        return pool.max_pending
+
+    def test_batches(self):
+        self.assertEqual(self._fetch(8, 32, 100), 32)
+        self.assertEqual(self._fetch(8, 32, 20), 20)
+        self.assertEqual(self._fetch(8, 40, 100), 40)
+
+    def test_max_inflight_below_pool_size(self):
+        self.assertEqual(self._fetch(8, 3, 10), 3)
+        self.assertEqual(self._fetch(8, 1, 10), 1)
+
+    def test_single_row(self):
+        self.assertEqual(self._fetch(8, 32, 1), 1)
+        self.assertEqual(self._fetch(1, 32, 1), 1)
+
+    def test_no_rows(self):
+        self.assertEqual(self._fetch(8, 32, 0), 0)
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    """
+    Pools of instances which are no longer scraped are closed.
+    """
+
+    def setUp(self):
+        self.now = 100.0
+        clock = types.SimpleNamespace(monotonic=lambda: self.now)
+        patcher = mock.patch.object(collector, 'time', clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    async def _keepalives():
+        await asyncio.sleep(0)
+        return len(asyncio.all_tasks()) - 1
+
+    def test_evict_idle(self):
+        async def scrape():
+            pools = ESLConnectionPool(max_idle=300)
+            first = pools.get('192.0.2.1', 8021, 'ClueCon')
+            self.now += 200
+            second = pools.get('192.0.2.2', 8021, 'ClueCon')
+            self.assertIs(pools.get('192.0.2.1', 8021, 'ClueCon'), first)
+            self.now += 299
+            pools.get('192.0.2.1', 8021, 'ClueCon')
+            self.assertEqual(await self._keepalives(), 2)
+
+            self.now += 1
+            pools.get('192.0.2.1', 8021, 'ClueCon')
+            self.assertEqual(await self._keepalives(), 1)
+            self.assertIsNot(pools.get('192.0.2.2', 8021, 'ClueCon'), second)
+            pools.close()
+            self.assertEqual(await self._keepalives(), 0)
+
+        asyncio.run(scrape())
+
+    def test_evict_least_recently_used(self):
+        async def scrape():
+            pools = ESLConnectionPool()
+            pools.max_pools = 2
+            first = pools.get('192.0.2.1', 8021, 'ClueCon')
+            second = pools.get('192.0.2.2', 8021, 'ClueCon')
+            self.assertIs(pools.get('192.0.2.1', 8021, 'ClueCon'), first)
+            pools.get('192.0.2.3', 8021, 'ClueCon')
+            self.assertEqual(await self._keepalives(), 2)
+            self.assertIs(pools.get('192.0.2.1', 8021, 'ClueCon'), first)
+            self.assertIsNot(pools.get('192.0.2.2', 8021, 'ClueCon'), second)
+            pools.close()
+
+        asyncio.run(scrape())
+
+
+if __name__ == '__main__':
+    unittest.main()
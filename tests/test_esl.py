@@ -0,0 +1,296 @@
+"""
+Tests for the ESL connection pool.
+"""
+
+import asyncio
+import types
+import unittest
+from unittest import mock
+
+from freeswitch_exporter import esl
+from freeswitch_exporter.esl import ESLPool
+
+
+class _FakeESL():
+    """
+    Stands in for a logged in ESL connection, records the sent commands.
+    """
+
+    def __init__(self, sent):
+        self._sent = sent
+        self.closed = False
+
+    async def send(self, command):  # pylint: disable=missing-docstring
+        self._sent.append(command)
+        await asyncio.sleep(0)
+        return {}, f'{command} #{len(self._sent)}'.encode()
+
+    def close(self):  # pylint: disable=missing-docstring
+        self.closed = True
+
+
+class PoolCacheTest(unittest.TestCase):
+    """
+    Replies to commands with a TTL are reused until they expire.
+    """
+
+    def setUp(self):
+        self.sent = []
+        self.now = 100.0
+        # Only the pool's clock, not the one of the event loop.
+        clock = types.SimpleNamespace(monotonic=lambda: self.now)
+        patcher = mock.patch.object(esl, 'time', clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _pool(self):
+        async def connect():
+            return _FakeESL(self.sent)
+        return ESLPool(connect, size=2, ttls={'api sofia xmlstatus gateway ': 5})
+
+    def test_cached_within_ttl(self):
+        async def scrape():
+            pool = self._pool()
+            first = await pool.send('api sofia xmlstatus gateway gw1')
+            self.now += 4.9
+            second = await pool.send('api sofia xmlstatus gateway gw1')
+            pool.close()
+            return first, second
+
+        first, second = asyncio.run(scrape())
+        self.assertEqual(first, second)
+        self.assertEqual(self.sent, ['api sofia xmlstatus gateway gw1'])
+
+    def test_resent_after_ttl(self):
+        async def scrape():
+            pool = self._pool()
+            await pool.send('api sofia xmlstatus gateway gw1')
+            self.now += 5
+            await pool.send('api sofia xmlstatus gateway gw1')
+            pool.close()
+
+        asyncio.run(scrape())
+        self.assertEqual(self.sent, ['api sofia xmlstatus gateway gw1'] * 2)
+
+    def test_uncached_commands(self):
+        async def scrape():
+            pool = self._pool()
+            await pool.send('api show calls as json')
+            await pool.send('api show calls as json')
+            await pool.send('api sofia xmlstatus gateway gw1')
+            await pool.send('api sofia xmlstatus gateway gw2')
+            pool.close()
+
+        asyncio.run(scrape())
+        self.assertEqual(self.sent, [
+            'api show calls as json',
+            'api show calls as json',
+            'api sofia xmlstatus gateway gw1',
+            'api sofia xmlstatus gateway gw2',
+        ])
+
+    def test_concurrent_callers_share_reply(self):
+        async def scrape():
+            pool = self._pool()
+            replies = await asyncio.gather(*(
+                pool.send('api sofia xmlstatus gateway gw1')
+                for _ in range(3)))
+            pool.close()
+            return replies
+
+        replies = asyncio.run(scrape())
+        self.assertEqual(len({body for _, body in replies}), 1)
+        self.assertEqual(self.sent, ['api sofia xmlstatus gateway gw1'])
+
+
+
+class _GatedESL(_FakeESL):
+    """
+    Connection which only replies to api status once the gate is set.
+    """
+
+    def __init__(self, sent, gate):
+        super().__init__(sent)
+        self._gate = gate
+
+    async def send(self, command):  # pylint: disable=missing-docstring
+        if command == 'api status':
+            await self._gate.wait()
+        return await super().send(command)
+
+
+class PoolCloseTest(unittest.TestCase):
+    """
+    Closing a pool closes idle connections and those still in use.
+    """
+
+    def test_close(self):
+        connections = []
+
+        async def scrape():
+            gate = asyncio.Event()
+
+            async def connect():
+                connections.append(_GatedESL([], gate))
+                return connections[-1]
+
+            pool = ESLPool(connect, size=2)
+            busy = asyncio.ensure_future(pool.send('api status'))
+            while not connections:
+                await asyncio.sleep(0)
+            await pool.send('api show calls as json')
+
+            pool.close()
+            self.assertEqual([esl.closed for esl in connections], [False, True])
+            gate.set()
+            await busy
+
+        asyncio.run(scrape())
+        self.assertEqual([esl.closed for esl in connections], [True, True])
+
+
+class _FlakyESL(_FakeESL):
+    """
+    Connection which fails every command once broken, like one to a
+    FreeSWITCH that has been restarted.
+    """
+
+    def __init__(self, sent, broken):
+        super().__init__(sent)
+        self.broken = broken
+
+    async def send(self, command):  # pylint: disable=missing-docstring
+        if self.broken:
+            raise asyncio.IncompleteReadError(b'', None)
+        return await super().send(command)
+
+
+class PoolRetryTest(unittest.TestCase):
+    """
+    Commands failing on an idle connection are retried once on a new one.
+    """
+
+    def setUp(self):
+        self.sent = []
+        self.connections = []
+        self.broken = False
+
+    def _pool(self):
+        async def connect():
+            self.connections.append(_FlakyESL(self.sent, self.broken))
+            return self.connections[-1]
+        return ESLPool(connect, size=2, ttls={'api sofia xmlstatus gateway ': 5})
+
+    def test_retry_reused(self):
+        async def scrape():
+            pool = self._pool()
+            await asyncio.gather(
+                pool.send('api sofia xmlstatus gateway gw1'),
+                pool.send('api status'))
+            self.assertEqual(len(self.connections), 2)
+
+            for connection in self.connections:
+                connection.broken = True
+            reply = await pool.send('api status')
+            # Idle connections alongside the failed one are dropped too, and
+            # so is the cache.
+            self.assertEqual([esl.closed for esl in self.connections],
+                             [True, True, False])
+            await pool.send('api sofia xmlstatus gateway gw1')
+            pool.close()
+            return reply
+
+        self.assertEqual(asyncio.run(scrape()), ({}, b'api status #3'))
+        self.assertEqual(len(self.connections), 3)
+        self.assertEqual(self.sent[2:], [
+            'api status',
+            'api sofia xmlstatus gateway gw1',
+        ])
+
+    def test_retry_once(self):
+        async def scrape():
+            pool = self._pool()
+            await pool.send('api status')
+            self.connections[0].broken = True
+            self.broken = True
+            with self.assertRaises(EOFError):
+                await pool.send('api status')
+            pool.close()
+
+        asyncio.run(scrape())
+        self.assertEqual(len(self.connections), 2)
+        self.assertEqual(self.sent, ['api status'])
+
+    def test_no_retry_fresh(self):
+        self.broken = True
+
+        async def scrape():
+            pool = self._pool()
+            with self.assertRaises(EOFError):
+                await pool.send('api status')
+            pool.close()
+
+        asyncio.run(scrape())
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(self.sent, [])
+
+
+class _StalledESL(_FakeESL):
+    """
+    Connection whose first command never gets a reply.
+    """
+
+    def __init__(self, sent, stalled):
+        super().__init__(sent)
+        self._stalled = stalled
+
+    async def send(self, command):  # pylint: disable=missing-docstring
+        if not self._stalled:
+            self._stalled.append(self)
+            await asyncio.Event().wait()
+        return await super().send(command)
+
+
+class PoolTimeoutTest(unittest.TestCase):
+    """
+    Stalled connections are dropped and do not hold on to pool slots.
+    """
+
+    def test_stalled_command(self):
+        sent = []
+        stalled = []
+
+        async def connect():
+            return _StalledESL(sent, stalled)
+
+        async def scrape():
+            pool = ESLPool(connect, size=1, timeout=0.01)
+            with self.assertRaises(asyncio.TimeoutError):
+                await pool.send('api uuid_dump x json')
+            # Would wait forever for the only slot if it had not been freed.
+            reply = await asyncio.wait_for(pool.send('api status'), 1)
+            pool.close()
+            return reply
+
+        self.assertEqual(asyncio.run(scrape()), ({}, b'api status #1'))
+        self.assertEqual(len(stalled), 1)
+
+    def test_stalled_connect(self):
+        attempts = []
+
+        async def connect():
+            attempts.append(None)
+            await asyncio.Event().wait()
+
+        async def scrape():
+            pool = ESLPool(connect, size=1, timeout=0.01)
+            for _ in range(2):
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(pool.send('api status'), 1)
+
+        asyncio.run(scrape())
+        self.assertEqual(len(attempts), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Tests for the Prometheus text format renderer.
+"""
+
+import unittest
+
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+from freeswitch_exporter.exposition import GaugeRows, render
+
+
+class _Families():  # pylint: disable=too-few-public-methods
+    def __init__(self, metrics):
+        self._metrics = metrics
+
+    def collect(self):  # pylint: disable=missing-docstring
+        return self._metrics
+
+
+def _expected(metrics):
+    registry = CollectorRegistry(auto_describe=False)
+    registry.register(_Families(metrics))
+    return generate_latest(registry)
+
+
+def _rendered(metrics):
+    out = bytearray()
+    render(metrics, out)
+    return bytes(out)
+
+
+class RenderTest(unittest.TestCase):
+    """
+    render() must produce the same bytes as prometheus_client.
+    """
+
+    def assertRendersLikeClient(self, metrics):  # pylint: disable=invalid-name
+        """
+        Assert that render() matches generate_latest() for metrics.
+        """
+        self.assertEqual(_rendered(metrics), _expected(metrics))
+
+    def test_unlabelled(self):
+        metric = GaugeRows('freeswitch_up', 'FreeSWITCH ready status')
+        metric.add_metric([], 1)
+        self.assertRendersLikeClient([metric])
+
+    def test_label_sorting(self):
+        metric = GaugeRows('freeswitch_channel_info', 'FreeSWITCH channel info',
+                           labels=['uuid', 'name', 'user_agent'])
+        metric.add_metric(['a1', 'sofia/internal/1000', 'Zoiper'], 1)
+        metric.add_metric(['b2', 'sofia/external/2000', 'Unknown'], 1)
+        self.assertRendersLikeClient([metric])
+
+    def test_escaping(self):
+        metric = GaugeRows('freeswitch_sofia_gateway_status',
+                           'Help with \\ backslash\nand "quotes"',
+                           labels=['name'])
+        metric.add_metric(['back\\slash'], 1)
+        metric.add_metric(['new\nline'], 2)
+        metric.add_metric(['"quoted"'], 3)
+        metric.add_metric(['Grün été'], 4)
+        self.assertRendersLikeClient([metric])
+
+    def test_special_values(self):
+        metric = GaugeRows('freeswitch_channel_rtp_jitter', 'Jitter',
+                           labels=['id'])
+        for value in (float('nan'), float('inf'), float('-inf'), 0, -0.5,
+                      1e-9, 12345678901234567890, 0.1):
+            metric.add_metric([str(len(metric.values))], value)
+        self.assertRendersLikeClient([metric])
+
+    def test_gauge_metric_family(self):
+        metric = GaugeMetricFamily('freeswitch_sofia_profile_calls_in',
+                                   'Sofia profile inbound calls',
+                                   labels=['profile', 'domain'])
+        metric.add_metric(['internal', 'example.com'], 3)
+        metric.add_metric(['external', 'a\\b"c\nd'], float('nan'))
+        self.assertRendersLikeClient([metric])
+
+    def test_multiple_families(self):
+        rows = GaugeRows('freeswitch_channel_info', 'Info', labels=['uuid'])
+        rows.add_metric(['x'], 1)
+        empty = GaugeRows('freeswitch_channel_empty', 'Empty', labels=['uuid'])
+        family = GaugeMetricFamily('freeswitch_calls', 'Calls')
+        family.add_metric([], 7)
+        self.assertRendersLikeClient([rows, empty, family])
+
+    def test_samples(self):
+        metric = GaugeRows('freeswitch_channel_info', 'Info',
+                           labels=['uuid', 'name'])
+        metric.add_metric(['x', 'y'], 2)
+        ((name, labels, value, *_),) = metric.samples
+        self.assertEqual(name, 'freeswitch_channel_info')
+        self.assertEqual(labels, {'uuid': 'x', 'name': 'y'})
+        self.assertEqual(value, 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+"""
+Tests for parsing sofia xmlstatus replies.
+"""
+
+import unittest
+
+from freeswitch_exporter.collector import (
+    _GATEWAY_FIELDS, _GATEWAY_RECORDS, _OVERVIEW_FIELDS, _OVERVIEW_RECORDS,
+    _PROFILE_FIELDS, _PROFILE_RECORDS, _parse_sofia)
+
+
+OVERVIEW = b"""<?xml version="1.0" encoding="ISO-8859-1"?>
+<profiles>
+  <profile>
+    <name>external</name>
+    <type>profile</type>
+    <data>sip:mod_sofia@192.0.2.10:5080</data>
+    <state>RUNNING (0)</state>
+  </profile>
+  <gateway>
+    <name>carrier-\xe9t\xe9</name>
+    <type>gateway</type>
+    <data>sip:trunk@sip.example.com</data>
+    <state>REGED</state>
+  </gateway>
+  <profile>
+    <name>internal</name>
+    <type>profile</type>
+    <data>sip:mod_sofia@192.0.2.10:5060</data>
+    <state>RUNNING (2)</state>
+  </profile>
+  <alias>
+    <name>192.0.2.10</name>
+    <type>alias</type>
+    <data>internal</data>
+    <state>ALIASED</state>
+  </alias>
+</profiles>
+"""
+
+PROFILE = b"""<?xml version="1.0" encoding="ISO-8859-1"?>
+<profile>
+  <profile-info>
+    <domain-name>N/A</domain-name>
+    <auto-nat>false</auto-nat>
+    <db-name>sofia_reg_internal</db-name>
+    <pres-hosts>192.0.2.10</pres-hosts>
+    <dialplan>XML</dialplan>
+    <context>public</context>
+    <challenge-realm>auto_from</challenge-realm>
+    <rtp-ip>192.0.2.10</rtp-ip>
+    <sip-ip>192.0.2.10</sip-ip>
+    <url>sip:mod_sofia@192.0.2.10:5060</url>
+    <bind-url>sip:mod_sofia@192.0.2.10:5060;maddr=192.0.2.10</bind-url>
+    <hold-music>local_stream://moh</hold-music>
+    <outbound-proxy>N/A</outbound-proxy>
+    <inbound-codecs>OPUS,G722,PCMU,PCMA</inbound-codecs>
+    <outbound-codecs>OPUS,G722,PCMU,PCMA</outbound-codecs>
+    <tel-event>101</tel-event>
+    <dtmf-mode>rfc2833</dtmf-mode>
+    <cng>13</cng>
+    <session-to>0</session-to>
+    <max-dialog>0</max-dialog>
+    <nomedia>false</nomedia>
+    <late-neg>true</late-neg>
+    <proxy-media>false</proxy-media>
+    <zrtp-passthru>true</zrtp-passthru>
+    <aggressive-nat>false</aggressive-nat>
+    <stun-enabled>true</stun-enabled>
+    <stun-auto-disable>false</stun-auto-disable>
+    <user-agent-filter>N/A</user-agent-filter>
+    <max-registrations-per-extension>0</max-registrations-per-extension>
+    <calls-in>12</calls-in>
+    <failed-calls-in>3</failed-calls-in>
+    <calls-out>7</calls-out>
+    <failed-calls-out>1</failed-calls-out>
+    <registrations>2</registrations>
+  </profile-info>
+  <registrations>
+    <registration>
+      <call-id>a84b4c76e66710</call-id>
+      <user>1000@192.0.2.10</user>
+      <contact>&quot;&quot; &lt;sip:1000@198.51.100.7:5060&gt;</contact>
+      <agent>Zoiper rv2.10</agent>
+      <status>Registered(UDP)(unknown) EXP(2024-01-01 00:00:00) EXPSECS(3600)</status>
+      <calls-in>99</calls-in>
+    </registration>
+  </registrations>
+</profile>
+"""
+
+GATEWAY = b"""<?xml version="1.0" encoding="ISO-8859-1"?>
+<gateway>
+  <name>carrier-\xe9t\xe9</name>
+  <profile>external</profile>
+  <scheme>Digest</scheme>
+  <realm>sip.example.com</realm>
+  <username>trunk</username>
+  <password>yes</password>
+  <from>&lt;sip:trunk@sip.example.com&gt;</from>
+  <contact>&lt;sip:gw+carrier@192.0.2.10:5080;transport=udp;gw=carrier&gt;</contact>
+  <exten>trunk</exten>
+  <to>sip:trunk@sip.example.com</to>
+  <proxy>sip:sip.example.com</proxy>
+  <context>public</context>
+  <expires>3600</expires>
+  <freq>3600</freq>
+  <ping>0</ping>
+  <pingfreq>0</pingfreq>
+  <pingmin>1</pingmin>
+  <pingcount>0</pingcount>
+  <pingmax>1</pingmax>
+  <pingtime>0.00</pingtime>
+  <pinging>0</pinging>
+  <state>REGED</state>
+  <status>UP</status>
+  <uptime-usec>86400000000</uptime-usec>
+  <calls-in>5</calls-in>
+  <calls-out>6</calls-out>
+  <failed-calls-in>0</failed-calls-in>
+  <failed-calls-out>2</failed-calls-out>
+</gateway>
+"""
+
+
+class ParseSofiaTest(unittest.TestCase):
+    """
+    _parse_sofia() on replies captured from FreeSWITCH.
+    """
+
+    def test_overview(self):
+        self.assertEqual(
+            _parse_sofia(OVERVIEW, _OVERVIEW_RECORDS, _OVERVIEW_FIELDS),
+            [
+                ('profile', {'name': 'external', 'state': 'RUNNING (0)'}),
+                ('gateway', {'name': 'carrier-été', 'state': 'REGED'}),
+                ('profile', {'name': 'internal', 'state': 'RUNNING (2)'}),
+            ])
+
+    def test_profile(self):
+        self.assertEqual(
+            _parse_sofia(PROFILE, _PROFILE_RECORDS, _PROFILE_FIELDS),
+            [('profile-info', {
+                'calls-in': '12',
+                'failed-calls-in': '3',
+                'calls-out': '7',
+                'failed-calls-out': '1',
+                'registrations': '2',
+            })])
+
+    def test_gateway(self):
+        self.assertEqual(
+            _parse_sofia(GATEWAY, _GATEWAY_RECORDS, _GATEWAY_FIELDS),
+            [('gateway', {
+                'status': 'UP',
+                'calls-in': '5',
+                'calls-out': '6',
+                'failed-calls-in': '0',
+                'failed-calls-out': '2',
+            })])
+
+    def test_nested_fields_are_ignored(self):
+        xml = b"""<?xml version="1.0"?>
+<profiles>
+  <profile>
+    <info><name>nested</name></info>
+    <name>outer</name>
+    <state>RUNNING (0)</state>
+  </profile>
+</profiles>
+"""
+        self.assertEqual(
+            _parse_sofia(xml, _OVERVIEW_RECORDS, _OVERVIEW_FIELDS),
+            [('profile', {'name': 'outer', 'state': 'RUNNING (0)'})])
+
+    def test_empty(self):
+        xml = b'<?xml version="1.0" encoding="ISO-8859-1"?>\n<profiles>\n</profiles>\n'
+        self.assertEqual(
+            _parse_sofia(xml, _OVERVIEW_RECORDS, _OVERVIEW_FIELDS), [])
+
+
+if __name__ == '__main__':
+    unittest.main()